@@ -3,9 +3,58 @@ import hmac
 import hashlib
 import logging
 from fastapi import Request, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
+# Hex length of an HMAC-SHA256 signature
+SIGNATURE_HEX_LENGTH = 2 * hashlib.sha256().digest_size
+
+# WEBHOOK_SECRET and its keyed HMAC state, resolved by load_webhook_secret().
+# The keyed state is copied per request so the ipad/opad key schedule is
+# only computed once.
+_secret_bytes = b""
+_keyed_mac = None
+
+# Largest accepted webhook body
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+# Received chunks are hashed in the threadpool once at least this many bytes
+# are pending. OpenSSL releases the GIL while hashing them, so the event loop
+# keeps serving other requests.
+HMAC_OFFLOAD_MIN_BYTES = int(os.getenv("HMAC_OFFLOAD_MIN_BYTES", str(1024 * 1024)))
+
+
+def load_webhook_secret() -> bytes:
+    """Read WEBHOOK_SECRET from the environment and rebuild the keyed HMAC state"""
+    global _secret_bytes, _keyed_mac
+    _secret_bytes = os.getenv("WEBHOOK_SECRET", "").encode("utf-8")
+    _keyed_mac = hmac.new(_secret_bytes, digestmod=hashlib.sha256) if _secret_bytes else None
+    return _secret_bytes
+
+
+def webhook_secret_configured() -> bool:
+    """Whether a non-empty WEBHOOK_SECRET was loaded"""
+    return bool(_secret_bytes)
+
+
+load_webhook_secret()
+
+
+def _update_mac(mac, chunks):
+    """Feed chunks into mac in order"""
+    for chunk in chunks:
+        mac.update(chunk)
+
+
+def _reject_too_large():
+    """Raise 413 for a body over MAX_BODY_BYTES"""
+    logger.warning(f"Request body exceeds {MAX_BODY_BYTES} bytes")
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Request body too large"
+    )
+
 
 async def validate_hmac_signature(request: Request) -> bytes:
     signature_header = request.headers.get("X-Signature")
@@ -16,23 +65,54 @@ async def validate_hmac_signature(request: Request) -> bytes:
             detail="Missing X-Signature"
         )
 
-    body = await request.body()
+    # Decode up front so malformed signatures are rejected before the body is read
+    signature = None
+    if len(signature_header) == SIGNATURE_HEX_LENGTH:
+        try:
+            signature = bytes.fromhex(signature_header)
+        except ValueError:
+            pass
+    if signature is None:
+        logger.warning("Malformed HMAC signature")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid signature"
+        )
 
-    secret = os.getenv("WEBHOOK_SECRET")
-    if not secret:
+    if _keyed_mac is None:
         logger.warning("WEBHOOK_SECRET not set")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid signature"
         )
 
-    expected_signature = hmac.new(
-        secret.encode("utf-8"),
-        body,
-        hashlib.sha256
-    ).hexdigest()
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        _reject_too_large()
+
+    # Hash the body as it arrives instead of buffering it first
+    mac = _keyed_mac.copy()
+    chunks = []
+    total = 0
+    pending = []
+    pending_bytes = 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        if total > MAX_BODY_BYTES:
+            _reject_too_large()
+        chunks.append(chunk)
+        pending.append(chunk)
+        pending_bytes += len(chunk)
+        # Servers deliver small chunks, so offload once enough bytes accumulate
+        if pending_bytes >= HMAC_OFFLOAD_MIN_BYTES:
+            await run_in_threadpool(_update_mac, mac, pending)
+            pending = []
+            pending_bytes = 0
+    _update_mac(mac, pending)
+    body = b"".join(chunks)
+    expected_signature = mac.digest()
 
-    if not hmac.compare_digest(signature_header, expected_signature):
+    if not hmac.compare_digest(signature, expected_signature):
         logger.warning("Invalid HMAC signature")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,16 +1,28 @@
-import json
 import logging
 import time
-from datetime import datetime
+import orjson
 from fastapi import Request, Response
 
 # Configure JSON logging
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached_second = None
+        self._cached_prefix = ""
+    
+    def format_timestamp(self, created: float) -> str:
+        """Format a record time as ISO 8601 UTC, reusing the formatted second"""
+        second = int(created)
+        if second != self._cached_second:
+            self._cached_second = second
+            self._cached_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self._cached_prefix}.{int((created - second) * 1_000_000):06d}Z"
+    
     def format(self, record):
         log_data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self.format_timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -24,7 +36,7 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "extra_fields"):
             log_data.update(record.extra_fields)
         
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logging():
@@ -41,23 +53,24 @@ def setup_logging():
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
 
+_http_logger = logging.getLogger("http")
+
+
 def log_request(request: Request, response: Response):
     """Log HTTP request in JSON format"""
-    logger = logging.getLogger("http")
+    if not _http_logger.isEnabledFor(logging.INFO):
+        return
     
-    # Calculate duration
-    if hasattr(request.state, "start_time"):
-        duration_ms = (time.time() - request.state.start_time) * 1000
-    else:
-        duration_ms = 0
+    # start_time is always set by the logging middleware
+    duration_ms = (time.perf_counter() - request.state.start_time) * 1000
+    client = request.client
     
     log_data = {
         "method": request.method,
         "path": request.url.path,
         "status_code": response.status_code,
         "duration_ms": round(duration_ms, 2),
-        "client_ip": request.client.host if request.client else None,
+        "client_ip": client.host if client else None,
     }
     
-    logger.info("HTTP request", extra={"extra_fields": log_data})
-
+    _http_logger.info("HTTP request", extra={"extra_fields": log_data})
@@ -1,4 +1,5 @@
 import os
+import time
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
@@ -7,8 +8,11 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from app.logging_config import setup_logging, log_request
 from app.metrics import setup_metrics, get_metrics_registry
-from app.storage import init_db, check_db_ready
+from app.storage import init_db, close_db
+from app.hmac_validation import load_webhook_secret
 from app.routes import router
+from app.write_buffer import write_buffer
+from app.orjson_response import ORJSONResponse
 
 # Setup logging
 setup_logging()
@@ -17,20 +21,30 @@ logger = logging.getLogger(__name__)
 # Setup metrics
 setup_metrics()
 
+# Scrapes within this many seconds reuse the last rendered output
+METRICS_CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "0.25"))
+_metrics_cached_at = 0.0
+_metrics_cached_body = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup"""
+    """Initialize database and webhook secret on startup, close the database on shutdown"""
     init_db()
+    load_webhook_secret()
+    write_buffer.start()
     logger.info("Application started")
     yield
     logger.info("Application shutting down")
+    await write_buffer.stop()
+    close_db()
 
 
 app = FastAPI(
     title="Lyftr AI Backend",
     description="Backend API with webhook handling and message management",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -47,8 +61,7 @@ app.add_middleware(
 @app.middleware("http")
 async def logging_middleware(request: Request, call_next):
     """Log all requests in JSON format"""
-    import time
-    request.state.start_time = time.time()
+    request.state.start_time = time.perf_counter()
     response = await call_next(request)
     log_request(request, response)
     return response
@@ -59,9 +72,14 @@ app.include_router(router)
 
 @app.get("/metrics")
 async def metrics():
-    """Prometheus-style metrics endpoint"""
+    """Prometheus-style metrics endpoint, cached for METRICS_CACHE_TTL seconds"""
+    global _metrics_cached_at, _metrics_cached_body
+    now = time.monotonic()
+    if _metrics_cached_body is None or now - _metrics_cached_at >= METRICS_CACHE_TTL:
+        _metrics_cached_body = generate_latest(get_metrics_registry())
+        _metrics_cached_at = now
     return Response(
-        content=generate_latest(get_metrics_registry()),
+        content=_metrics_cached_body,
         media_type=CONTENT_TYPE_LATEST
     )
 
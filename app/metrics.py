@@ -31,6 +31,23 @@ messages_in_db = Gauge(
     registry=metrics_registry
 )
 
+# Pre-bound label children for the fixed endpoints, so the request path
+# skips the per-call label lookup
+WEBHOOK_201 = http_requests_total.labels(method="POST", endpoint="/webhook", status="201")
+WEBHOOK_500 = http_requests_total.labels(method="POST", endpoint="/webhook", status="500")
+WEBHOOK_DURATION = http_request_duration_seconds.labels(method="POST", endpoint="/webhook")
+
+MESSAGES_200 = http_requests_total.labels(method="GET", endpoint="/messages", status="200")
+MESSAGES_500 = http_requests_total.labels(method="GET", endpoint="/messages", status="500")
+MESSAGES_DURATION = http_request_duration_seconds.labels(method="GET", endpoint="/messages")
+
+HEALTH_LIVE_200 = http_requests_total.labels(method="GET", endpoint="/health/live", status="200")
+HEALTH_LIVE_DURATION = http_request_duration_seconds.labels(method="GET", endpoint="/health/live")
+
+HEALTH_READY_200 = http_requests_total.labels(method="GET", endpoint="/health/ready", status="200")
+HEALTH_READY_503 = http_requests_total.labels(method="GET", endpoint="/health/ready", status="503")
+HEALTH_READY_DURATION = http_request_duration_seconds.labels(method="GET", endpoint="/health/ready")
+
 
 def setup_metrics():
     """Setup metrics (called on app startup)"""
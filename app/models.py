@@ -23,10 +23,11 @@ class MessageResponse(BaseModel):
 class MessageListResponse(BaseModel):
     """Paginated message list response"""
     messages: list[MessageResponse]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class HealthResponse(BaseModel):
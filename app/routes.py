@@ -1,20 +1,37 @@
-import os
-import json
+import orjson
 import logging
 from typing import Optional
 from fastapi import APIRouter, Request, HTTPException, status, Query
 from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
-from app.models import WebhookPayload, MessageResponse, MessageListResponse, HealthResponse
-from app.storage import insert_message, get_messages, check_db_ready
-from app.hmac_validation import validate_hmac_signature
-from app.metrics import http_requests_total, http_request_duration_seconds, webhook_messages_total, messages_in_db
+from app.models import WebhookPayload, MessageListResponse, HealthResponse
+from app.storage import get_messages, check_db_ready
+from app.hmac_validation import validate_hmac_signature, webhook_secret_configured
+from app.orjson_response import ORJSONResponse
+from app.write_buffer import insert_message
+from app.metrics import (
+    webhook_messages_total, messages_in_db,
+    WEBHOOK_201, WEBHOOK_500, WEBHOOK_DURATION,
+    MESSAGES_200, MESSAGES_500, MESSAGES_DURATION,
+    HEALTH_LIVE_200, HEALTH_LIVE_DURATION,
+    HEALTH_READY_200, HEALTH_READY_503, HEALTH_READY_DURATION,
+)
 import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _payload_source(body_bytes: bytes) -> str:
+    """Best-effort source label for a payload that failed validation"""
+    try:
+        source = orjson.loads(body_bytes).get("source")
+    except Exception:
+        return "unknown"
+    return source if isinstance(source, str) else "unknown"
+
+
 @router.post("/webhook", status_code=status.HTTP_201_CREATED)
 async def webhook(request: Request):
     """
@@ -26,36 +43,41 @@ async def webhook(request: Request):
         # Validate HMAC signature and get raw body
         body_bytes = await validate_hmac_signature(request)
         
-        # Parse JSON payload
+        # Parse and validate payload in a single pass
         try:
-            payload = json.loads(body_bytes.decode("utf-8"))
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON payload: {e}")
-            webhook_messages_total.labels(source="unknown", status="error").inc()
+            webhook_payload = WebhookPayload.model_validate_json(body_bytes)
+        except ValidationError as e:
+            if e.errors()[0]["type"] == "json_invalid":
+                logger.error(f"Invalid JSON payload: {e}")
+                webhook_messages_total.labels(source="unknown", status="error").inc()
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid JSON payload"
+                )
+            logger.error(f"Invalid payload structure: {e}")
+            webhook_messages_total.labels(source=_payload_source(body_bytes), status="error").inc()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid JSON payload"
+                detail=f"Invalid payload structure: {str(e)}"
             )
         
-        # Validate payload structure
+        # Insert message (idempotent)
         try:
-            webhook_payload = WebhookPayload(**payload)
-        except Exception as e:
+            inserted = await insert_message(
+                message_id=webhook_payload.message_id,
+                timestamp=webhook_payload.timestamp,
+                source=webhook_payload.source,
+                raw_data=webhook_payload.raw_data
+            )
+        except orjson.JSONEncodeError as e:
+            # raw_data that orjson cannot store, e.g. integers wider than 64 bits
             logger.error(f"Invalid payload structure: {e}")
-            webhook_messages_total.labels(source=payload.get("source", "unknown"), status="error").inc()
+            webhook_messages_total.labels(source=webhook_payload.source, status="error").inc()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid payload structure: {str(e)}"
             )
         
-        # Insert message (idempotent)
-        inserted = insert_message(
-            message_id=webhook_payload.message_id,
-            timestamp=webhook_payload.timestamp,
-            source=webhook_payload.source,
-            raw_data=webhook_payload.raw_data
-        )
-        
         if inserted:
             logger.info(f"New message stored: {webhook_payload.message_id}")
             webhook_messages_total.labels(source=webhook_payload.source, status="success").inc()
@@ -65,8 +87,8 @@ async def webhook(request: Request):
             webhook_messages_total.labels(source=webhook_payload.source, status="duplicate").inc()
         
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="POST", endpoint="/webhook").observe(duration)
-        http_requests_total.labels(method="POST", endpoint="/webhook", status="201").inc()
+        WEBHOOK_DURATION.observe(duration)
+        WEBHOOK_201.inc()
         
         return {
             "message": "Webhook received",
@@ -79,65 +101,71 @@ async def webhook(request: Request):
     except Exception as e:
         logger.error(f"Unexpected error in webhook: {e}", exc_info=True)
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="POST", endpoint="/webhook").observe(duration)
-        http_requests_total.labels(method="POST", endpoint="/webhook", status="500").inc()
+        WEBHOOK_DURATION.observe(duration)
+        WEBHOOK_500.inc()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
 
 
-@router.get("/messages", response_model=MessageListResponse)
+@router.get("/messages", responses={200: {"model": MessageListResponse}})
 async def get_messages_endpoint(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Page size"),
     source: Optional[str] = Query(None, description="Filter by source"),
     start_date: Optional[str] = Query(None, description="Filter by start date (ISO 8601)"),
-    end_date: Optional[str] = Query(None, description="Filter by end date (ISO 8601)")
+    end_date: Optional[str] = Query(None, description="Filter by end date (ISO 8601)"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor of the previous page (overrides page)")
 ):
     """
     Get paginated messages with optional filtering.
+    Prefer following next_cursor over page numbers for deep pagination.
     """
     start_time = time.time()
     
     try:
-        messages, total = get_messages(
+        messages, total, next_cursor = get_messages(
             page=page,
             page_size=page_size,
             source=source,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            cursor=cursor
         )
         
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-        
-        for msg in messages:
-            if "timestamp" in msg and isinstance(msg["timestamp"], str):
-                msg["timestamp"] = msg["timestamp"][:10]
-
-        message_responses = [
-            MessageResponse(**msg) for msg in messages
-        ]
+        if total is None:
+            total_pages = None
+        else:
+            total_pages = (total + page_size - 1) // page_size if total > 0 else 0
         
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="GET", endpoint="/messages").observe(duration)
-        http_requests_total.labels(method="GET", endpoint="/messages", status="200").inc()
+        MESSAGES_DURATION.observe(duration)
+        MESSAGES_200.inc()
 
         
             
-        return MessageListResponse(
-            messages=message_responses,
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages
-        )
+        # Rows are returned as-is; the response model is documentation only
+        return ORJSONResponse({
+            "messages": messages,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "next_cursor": next_cursor
+        })
         
+    except ValueError as e:
+        logger.warning(f"Invalid messages query: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
     except Exception as e:
         logger.error(f"Error fetching messages: {e}", exc_info=True)
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="GET", endpoint="/messages").observe(duration)
-        http_requests_total.labels(method="GET", endpoint="/messages", status="500").inc()
+        MESSAGES_DURATION.observe(duration)
+        MESSAGES_500.inc()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -150,9 +178,9 @@ async def health_live():
     Liveness probe - always returns 200.
     """
     start_time = time.time()
-    http_requests_total.labels(method="GET", endpoint="/health/live", status="200").inc()
+    HEALTH_LIVE_200.inc()
     duration = time.time() - start_time
-    http_request_duration_seconds.labels(method="GET", endpoint="/health/live").observe(duration)
+    HEALTH_LIVE_DURATION.observe(duration)
     return HealthResponse(status="alive")
 
 
@@ -167,17 +195,17 @@ async def health_ready():
     db_ready = check_db_ready()
     
     # Check webhook secret
-    webhook_secret_exists = bool(os.getenv("WEBHOOK_SECRET"))
+    webhook_secret_exists = webhook_secret_configured()
     
     if db_ready and webhook_secret_exists:
-        http_requests_total.labels(method="GET", endpoint="/health/ready", status="200").inc()
+        HEALTH_READY_200.inc()
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="GET", endpoint="/health/ready").observe(duration)
+        HEALTH_READY_DURATION.observe(duration)
         return HealthResponse(status="ready")
     else:
-        http_requests_total.labels(method="GET", endpoint="/health/ready", status="503").inc()
+        HEALTH_READY_503.inc()
         duration = time.time() - start_time
-        http_request_duration_seconds.labels(method="GET", endpoint="/health/ready").observe(duration)
+        HEALTH_READY_DURATION.observe(duration)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Service not ready"
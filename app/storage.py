@@ -1,12 +1,32 @@
 import os
+import base64
+import itertools
 import sqlite3
-import json
+import threading
+import orjson
 from datetime import datetime
 from typing import Optional, List, Tuple
-from contextlib import contextmanager
 
 DB_PATH = "/data/app.db"
 
+# Applied once to every new connection
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+# OR IGNORE keeps duplicate message_ids idempotent without aborting a batch
+INSERT_MESSAGE_SQL = """
+    INSERT OR IGNORE INTO messages (message_id, timestamp, source, raw_data, created_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# One connection per thread, reused across requests
+_local = threading.local()
+
 
 def get_db_path():
     """Get database path, create directory if needed"""
@@ -16,72 +36,157 @@ def get_db_path():
     return DB_PATH
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Get this thread's database connection, opening it on first use.
+    Use as `with get_db_connection() as conn:` to commit or roll back.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+
+def close_db():
+    """Close this thread's database connection"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
         conn.close()
+        _local.conn = None
 
 
 def init_db():
     """Initialize database schema"""
+    get_db_path()
     with get_db_connection() as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS messages (
                 message_id TEXT PRIMARY KEY,
                 timestamp TEXT NOT NULL,
                 source TEXT NOT NULL,
-                raw_data TEXT NOT NULL,
+                raw_data BLOB NOT NULL,
                 created_at TEXT NOT NULL
             )
         """)
         conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp ON messages(timestamp)
+            CREATE INDEX IF NOT EXISTS idx_timestamp_mid ON messages(timestamp DESC, message_id DESC)
         """)
+        # Serves source filters in list order
         conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_source ON messages(source)
+            CREATE INDEX IF NOT EXISTS idx_source_ts ON messages(source, timestamp DESC, message_id DESC)
         """)
+        # Superseded by the composite indexes above
+        conn.execute("DROP INDEX IF EXISTS idx_timestamp")
+        conn.execute("DROP INDEX IF EXISTS idx_source")
+        # Refresh planner statistics, sampling a bounded number of rows per index
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
 
 
 def check_db_ready() -> bool:
     """Check if database is ready"""
     try:
+        # A persistent connection keeps working on a deleted database file
+        if not os.path.exists(DB_PATH):
+            raise sqlite3.OperationalError(f"Database file missing: {DB_PATH}")
         with get_db_connection() as conn:
-            conn.execute("SELECT 1")
+            conn.execute("SELECT 1 FROM messages LIMIT 1")
         return True
+    except sqlite3.Error:
+        close_db()
+        return False
     except Exception:
         return False
 
 
-def insert_message(message_id: str, timestamp: str, source: str, raw_data: dict) -> bool:
+def message_row(message_id: str, timestamp: str, source: str, raw_data: dict) -> tuple:
+    """Build the parameter tuple for INSERT_MESSAGE_SQL"""
+    return (
+        message_id,
+        timestamp,
+        source,
+        orjson.dumps(raw_data),
+        datetime.utcnow().isoformat()
+    )
+
+
+def insert_messages(rows: List[tuple]) -> List[bool]:
+    """
+    Insert a batch of message rows in a single transaction.
+    Returns one flag per row: True if inserted, False if already exists.
+    """
+    results = []
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # Executed row by row: executemany only reports the total change count
+        for row in rows:
+            cursor = conn.execute(INSERT_MESSAGE_SQL, row)
+            results.append(cursor.rowcount == 1)
+    return results
+
+
+_LIST_PAGE_SQL = """
+    SELECT message_id, substr(timestamp, 1, 10) AS timestamp, source, raw_data, created_at,
+           messages.timestamp AS sort_timestamp
+    FROM messages
+    WHERE {where_clause}
+    ORDER BY messages.timestamp DESC, message_id DESC
+    LIMIT ? OFFSET ?
+"""
+
+
+def _build_list_queries(has_source: bool, has_start: bool, has_end: bool) -> Tuple[str, str, str]:
+    """Build (count_sql, page_sql, cursor_page_sql) for one combination of filters"""
+    conditions = []
+    if has_source:
+        conditions.append("source = ?")
+    if has_start:
+        conditions.append("timestamp >= ?")
+    if has_end:
+        conditions.append("timestamp <= ?")
+    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    
+    return (
+        f"SELECT COUNT(*) as count FROM messages WHERE {where_clause}",
+        _LIST_PAGE_SQL.format(where_clause=where_clause),
+        _LIST_PAGE_SQL.format(
+            where_clause=f"{where_clause} AND (messages.timestamp, message_id) < (?, ?)"
+        ),
+    )
+
+
+# get_messages queries keyed by (has_source, has_start_date, has_end_date),
+# so every request reuses the same SQL strings from sqlite3's statement cache
+_LIST_QUERIES = {
+    key: _build_list_queries(*key)
+    for key in itertools.product((False, True), repeat=3)
+}
+
+
+def encode_cursor(timestamp: str, message_id: str) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(orjson.dumps([timestamp, message_id])).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
     """
-    Insert message with idempotency check.
-    Returns True if inserted, False if already exists.
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed.
     """
     try:
-        with get_db_connection() as conn:
-            conn.execute("""
-                INSERT INTO messages (message_id, timestamp, source, raw_data, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                message_id,
-                timestamp,
-                source,
-                json.dumps(raw_data),
-                datetime.utcnow().isoformat()
-            ))
-        return True
-    except sqlite3.IntegrityError:
-        # Message ID already exists (idempotency)
-        return False
+        timestamp, message_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(timestamp, str) or not isinstance(message_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return timestamp, message_id
 
 
 def get_messages(
@@ -89,51 +194,53 @@ def get_messages(
     page_size: int = 10,
     source: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
-) -> Tuple[List[dict], int]:
+    end_date: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
     """
     Get paginated messages with optional filtering.
-    Returns (messages, total_count)
+    Returns (messages, total_count, next_cursor); timestamps are truncated
+    to the date.
+
+    When cursor is given, page is ignored and the page starts right after
+    the cursor row (keyset pagination), so deep pages cost the same as the
+    first. total_count is None for cursor pages, since counting would scan
+    every matching row. next_cursor is None when there are no more rows.
+
+    raw_data is returned as an orjson.Fragment of the stored bytes so it is
+    embedded in the response without a parse/re-serialize round-trip.
     """
     offset = (page - 1) * page_size
     
-    # Build WHERE clause
-    conditions = []
-    params = []
-    
-    if source:
-        conditions.append("source = ?")
-        params.append(source)
-    
-    if start_date:
-        conditions.append("timestamp >= ?")
-        params.append(start_date)
-    
-    if end_date:
-        conditions.append("timestamp <= ?")
-        params.append(end_date)
+    count_sql, page_sql, cursor_sql = _LIST_QUERIES[(bool(source), bool(start_date), bool(end_date))]
+    params = tuple(value for value in (source, start_date, end_date) if value)
     
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    # The cursor only narrows the page, not the total
+    if cursor:
+        query = cursor_sql
+        page_params = params + decode_cursor(cursor)
+        offset = 0
+    else:
+        query = page_sql
+        page_params = params
     
-    # Get total count
     with get_db_connection() as conn:
-        count_result = conn.execute(
-            f"SELECT COUNT(*) as count FROM messages WHERE {where_clause}",
-            params
-        ).fetchone()
-        total = count_result["count"] if count_result else 0
-        
         # Get paginated results
-        query = f"""
-            SELECT message_id, timestamp, source, raw_data, created_at
-            FROM messages
-            WHERE {where_clause}
-            ORDER BY timestamp DESC
-            LIMIT ? OFFSET ?
-        """
-        params_with_pagination = params + [page_size, offset]
+        # One extra row tells whether another page follows
+        rows = conn.execute(query, page_params + (page_size + 1, offset)).fetchall()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
         
-        rows = conn.execute(query, params_with_pagination).fetchall()
+        # The last offset page already determines the total; otherwise count
+        # separately (a COUNT(*) OVER () window would buffer every matching
+        # row, raw_data included, before the LIMIT)
+        if cursor:
+            total = None
+        elif not has_more and (rows or offset == 0):
+            total = offset + len(rows)
+        else:
+            count_result = conn.execute(count_sql, params).fetchone()
+            total = count_result["count"] if count_result else 0
         
         messages = []
         for row in rows:
@@ -141,9 +248,12 @@ def get_messages(
                 "message_id": row["message_id"],
                 "timestamp": row["timestamp"],
                 "source": row["source"],
-                "raw_data": json.loads(row["raw_data"]),
+                "raw_data": orjson.Fragment(row["raw_data"]),
                 "created_at": row["created_at"]
             })
     
-    return messages, total
-
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(rows[-1]["sort_timestamp"], rows[-1]["message_id"])
+    
+    return messages, total, next_cursor
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import logging
+from typing import List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.storage import insert_messages, message_row
+
+logger = logging.getLogger(__name__)
+
+# Maximum rows per transaction and how long to wait for a batch to fill
+BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+BATCH_MS = float(os.getenv("WRITE_BATCH_MS", "5"))
+
+
+class WriteBuffer:
+    """Coalesces message inserts into batched transactions"""
+
+    def __init__(self):
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher after it writes every row queued so far"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def put(self, row: tuple) -> bool:
+        """Queue a row for insertion; resolves to True if inserted, False if duplicate"""
+        if (
+            self._task is None
+            or self._task.done()
+            or self._loop is not asyncio.get_running_loop()
+        ):
+            self.start()
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _run(self):
+        # A None item is the stop sentinel queued by stop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = self._loop.time() + BATCH_MS / 1000
+            # Fill the batch until BATCH_SIZE rows or BATCH_MS, whichever comes first
+            while len(batch) < BATCH_SIZE:
+                if self._queue.empty():
+                    timeout = deadline - self._loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        # Written in the threadpool so a slow or locked transaction doesn't
+        # block the event loop; results are resolved back on the loop
+        try:
+            results = await run_in_threadpool(insert_messages, [row for row, _ in batch])
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} messages: {e}", exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), inserted in zip(batch, results):
+            if not future.done():
+                future.set_result(inserted)
+
+
+write_buffer = WriteBuffer()
+
+
+async def insert_message(message_id: str, timestamp: str, source: str, raw_data: dict) -> bool:
+    """
+    Insert message through the write buffer.
+    Returns True if inserted, False if already exists.
+    """
+    return await write_buffer.put(message_row(message_id, timestamp, source, raw_data))
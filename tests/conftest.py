@@ -1,12 +1,14 @@
 import pytest
 import os
+import shutil
 import tempfile
-from app import storage
+from app import storage, hmac_validation
 
 @pytest.fixture(autouse=True)
 def setup_test_env_and_db(monkeypatch):
     # ✅ FORCE environment variable for pytest runtime
     monkeypatch.setenv("WEBHOOK_SECRET", "testsecret")
+    hmac_validation.load_webhook_secret()
 
     # ---- DB setup ----
     test_db_dir = tempfile.mkdtemp()
@@ -18,7 +20,5 @@ def setup_test_env_and_db(monkeypatch):
     yield
 
     # ---- Cleanup ----
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-    if os.path.exists(test_db_dir):
-        os.rmdir(test_db_dir)
+    storage.close_db()
+    shutil.rmtree(test_db_dir, ignore_errors=True)
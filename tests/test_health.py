@@ -2,6 +2,7 @@ import pytest
 import os
 from fastapi.testclient import TestClient
 from app.main import app
+from app.hmac_validation import load_webhook_secret
 
 
 @pytest.fixture
@@ -22,6 +23,7 @@ def test_health_live(client):
 def test_health_ready_with_secret(client):
     """Test readiness endpoint with WEBHOOK_SECRET set"""
     os.environ["WEBHOOK_SECRET"] = "test_secret"
+    load_webhook_secret()
     
     response = client.get("/health/ready")
     
@@ -34,8 +36,18 @@ def test_health_ready_without_secret(client):
     """Test readiness endpoint without WEBHOOK_SECRET"""
     if "WEBHOOK_SECRET" in os.environ:
         del os.environ["WEBHOOK_SECRET"]
+    load_webhook_secret()
     
     response = client.get("/health/ready")
     
     assert response.status_code == 503
 
+
+def test_health_ready_without_database(client):
+    """Test readiness endpoint after the database file is removed"""
+    from app import storage
+    os.remove(storage.DB_PATH)
+    
+    response = client.get("/health/ready")
+    
+    assert response.status_code == 503
@@ -97,3 +97,93 @@ def test_get_messages_filter_by_date(client, sample_messages):
     for msg in data["messages"]:
         assert "2024-01-02" <= msg["timestamp"] <= "2024-01-04"
 
+
+
+def test_get_messages_raw_data_roundtrip(client, sample_messages):
+    """Test raw_data is returned exactly as submitted"""
+    response = client.get("/messages?source=source_b")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(msg["raw_data"]["index"] for msg in data["messages"]) == [1, 3]
+
+
+def test_get_messages_same_day_ordering(client):
+    """Test date-truncated timestamps still sort by full timestamp"""
+    secret = os.getenv("WEBHOOK_SECRET")
+    for message_id, timestamp in [("msg_am", "2024-02-01T08:00:00Z"), ("msg_pm", "2024-02-01T20:00:00Z")]:
+        body = json.dumps({
+            "message_id": message_id,
+            "timestamp": timestamp,
+            "source": "source_a",
+            "raw_data": {}
+        }).encode("utf-8")
+        client.post(
+            "/webhook",
+            content=body,
+            headers={"X-Signature": compute_signature(body, secret), "Content-Type": "application/json"}
+        )
+    
+    response = client.get("/messages")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert [msg["message_id"] for msg in data["messages"]] == ["msg_pm", "msg_am"]
+    assert all(msg["timestamp"] == "2024-02-01" for msg in data["messages"])
+
+
+def test_get_messages_cursor_pagination(client, sample_messages):
+    """Test walking all pages with next_cursor"""
+    seen = []
+    response = client.get("/messages?page_size=2")
+    assert response.json()["total"] == 5
+    while True:
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(msg["message_id"] for msg in data["messages"])
+        if not data["next_cursor"]:
+            break
+        response = client.get(f"/messages?page_size=2&cursor={data['next_cursor']}")
+        assert response.json()["total"] is None
+    
+    assert seen == ["msg_4", "msg_3", "msg_2", "msg_1", "msg_0"]
+
+
+def test_get_messages_no_cursor_on_exact_last_page(client, sample_messages):
+    """Test a full last page does not return a cursor to an empty page"""
+    response = client.get("/messages?page_size=5")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["messages"]) == 5
+    assert data["next_cursor"] is None
+    assert data["total"] == 5
+
+
+def test_get_messages_invalid_cursor(client, sample_messages):
+    """Test malformed cursor is rejected"""
+    response = client.get("/messages?cursor=not-a-cursor")
+    
+    assert response.status_code == 400
+
+
+def test_get_messages_total_on_last_and_past_pages(client, sample_messages):
+    """Test total is reported on the last page and past the end"""
+    for page, expected_count in [(3, 1), (4, 0)]:
+        response = client.get(f"/messages?page={page}&page_size=2")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["messages"]) == expected_count
+        assert data["total"] == 5
+        assert data["total_pages"] == 3
+
+
+def test_get_messages_filter_by_source_and_date(client, sample_messages):
+    """Test combining source and date range filters"""
+    response = client.get("/messages?source=source_a&start_date=2024-01-02T00:00:00Z")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert [msg["message_id"] for msg in data["messages"]] == ["msg_4", "msg_2"]
+    assert data["total"] == 2
@@ -20,3 +20,18 @@ def test_metrics_endpoint(client):
     # Check for Prometheus-style metrics
     assert "http_requests_total" in content or "# HELP" in content
 
+
+
+def test_metrics_cached_within_ttl(client, monkeypatch):
+    """Test scrapes within the TTL reuse the rendered output"""
+    from app import main
+    monkeypatch.setattr(main, "METRICS_CACHE_TTL", 60.0)
+    
+    first = client.get("/metrics").text
+    client.get("/health/live")
+    second = client.get("/metrics").text
+    
+    assert first == second
+    
+    monkeypatch.setattr(main, "METRICS_CACHE_TTL", 0.0)
+    assert client.get("/metrics").text != first
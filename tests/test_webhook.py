@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 import json
 import hmac
 import hashlib
@@ -118,3 +119,145 @@ def test_webhook_invalid_json(client):
     
     assert response.status_code == 400
 
+
+
+def test_webhook_large_body_offloaded(webhook_payload, monkeypatch):
+    """Test hashing moves to the threadpool once enough small chunks arrive"""
+    from starlette.requests import Request
+    from app import hmac_validation
+    monkeypatch.setattr(hmac_validation, "HMAC_OFFLOAD_MIN_BYTES", 32)
+    offloaded = []
+    
+    async def recording_run_in_threadpool(func, *args):
+        offloaded.append(sum(len(chunk) for chunk in args[-1]))
+        return func(*args)
+    
+    monkeypatch.setattr(hmac_validation, "run_in_threadpool", recording_run_in_threadpool)
+    
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))
+    chunks = [body[i:i + 10] for i in range(0, len(body), 10)]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    
+    async def receive():
+        return messages.pop(0)
+    
+    request = Request({
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"x-signature", signature.encode())],
+    }, receive)
+    
+    assert asyncio.run(hmac_validation.validate_hmac_signature(request)) == body
+    assert len(offloaded) > 1
+    assert all(size >= 32 for size in offloaded)
+
+
+def test_webhook_with_lifespan_flusher(webhook_payload):
+    """Test webhook through the write buffer started by the app lifespan"""
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))
+    
+    with TestClient(app) as client:
+        for expected_duplicate in (False, True):
+            response = client.post(
+                "/webhook",
+                content=body,
+                headers={"X-Signature": signature, "Content-Type": "application/json"}
+            )
+            assert response.status_code == 201
+            assert response.json()["duplicate"] is expected_duplicate
+
+
+def test_write_buffer_batches_duplicates():
+    """Test duplicates coalesced into one write batch are detected per row"""
+    from app.write_buffer import insert_message
+    
+    async def submit():
+        return await asyncio.gather(*(
+            insert_message("msg_batch", "2024-01-01T00:00:00Z", "test_source", {"n": i})
+            for i in range(3)
+        ))
+    
+    assert asyncio.run(submit()) == [True, False, False]
+
+
+def test_webhook_truncated_signature(client, webhook_payload):
+    """Test webhook with a valid hex signature of the wrong length"""
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))[:32]
+    
+    response = client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature, "Content-Type": "application/json"}
+    )
+    
+    assert response.status_code == 401
+
+
+def test_webhook_invalid_structure(client, webhook_payload):
+    """Test webhook with valid JSON missing required fields"""
+    del webhook_payload["source"]
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))
+    
+    response = client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature, "Content-Type": "application/json"}
+    )
+    
+    assert response.status_code == 400
+    assert "Invalid payload structure" in response.json()["detail"]
+
+
+def test_webhook_body_too_large(client, webhook_payload, monkeypatch):
+    """Test webhook body over MAX_BODY_BYTES is rejected"""
+    from app import hmac_validation
+    monkeypatch.setattr(hmac_validation, "MAX_BODY_BYTES", 16)
+    
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))
+    
+    response = client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature, "Content-Type": "application/json"}
+    )
+    
+    assert response.status_code == 413
+
+
+def test_webhook_oversized_integer(client, webhook_payload):
+    """Test raw_data with an integer wider than 64 bits is rejected"""
+    webhook_payload["raw_data"] = {"n": 123456789012345678901234567890}
+    body = json.dumps(webhook_payload).encode("utf-8")
+    signature = compute_signature(body, os.getenv("WEBHOOK_SECRET"))
+    
+    response = client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature, "Content-Type": "application/json"}
+    )
+    
+    assert response.status_code == 400
+    assert "Invalid payload structure" in response.json()["detail"]
+
+
+def test_write_buffer_flushes_full_batch_early(monkeypatch):
+    """Test a full batch is written without waiting out WRITE_BATCH_MS"""
+    from app import write_buffer
+    monkeypatch.setattr(write_buffer, "BATCH_SIZE", 3)
+    monkeypatch.setattr(write_buffer, "BATCH_MS", 60_000)
+    
+    async def submit():
+        return await asyncio.wait_for(asyncio.gather(*(
+            write_buffer.insert_message(f"msg_full_{i}", "2024-01-01T00:00:00Z", "test_source", {})
+            for i in range(3)
+        )), timeout=5)
+    
+    assert asyncio.run(submit()) == [True, True, True]